@@ -1,14 +1,13 @@
-import os
 import sys
 from pathlib import Path
 
-from sphinx_codeautolink import __version__, clean_pycon
+from sphinx_codeautolink import __version__
 
-# Insert package root to path
-_src_dir = Path(os.path.realpath(__file__)).parent
-_package_root = _src_dir.parent.parent / "src"
-sys.path.insert(0, str(_package_root))
-sys.path.insert(0, str(_src_dir))
+# Insert package root and docs source to path once, even if re-executed
+_src_dir = Path(__file__).resolve().parent
+for _path in (str(_src_dir.parent.parent / "src"), str(_src_dir)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
 
 project = "sphinx-codeautolink"
 author = "Felix Hildén"
@@ -18,7 +17,6 @@ release = version
 
 extensions = [
     "sphinx.ext.autodoc",
-    "sphinx.ext.napoleon",
     "sphinx.ext.intersphinx",
     "sphinx.ext.extlinks",
     "sphinx_rtd_theme",
@@ -36,8 +34,10 @@ show_warning_types = True
 
 # Extension options
 codeautolink_autodoc_inject = True
-codeautolink_custom_blocks = {"python3": None, "pycon3": clean_pycon}
-suppress_warnings = ["config.cache"]
+codeautolink_custom_blocks = {
+    "python3": None,
+    "pycon3": "sphinx_codeautolink.clean_pycon",
+}
 
 autodoc_default_options = {"members": True, "undoc-members": True}
 autodoc_typehints = "description"
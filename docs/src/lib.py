@@ -1,12 +1,20 @@
+from dataclasses import dataclass
+
+
 class Knight:
-    limbs: int = 4
-    taunts: list[str] = [
+    __slots__ = ("limbs",)
+
+    limbs: int
+    taunts: tuple[str, ...] = (
         "None shall pass!",
         "'Tis but a scratch!",
         "It's just a flesh wound... Chicken!",
         "Right, I'll do you for that!",
         "Oh, I see, running away?",
-    ]
+    )
+
+    def __init__(self) -> None:
+        self.limbs = 4
 
     def scratch(self) -> None:
         """Scratch the knight."""
@@ -14,15 +22,12 @@ class Knight:
 
     def taunt(self) -> str:
         """Knight taunts the adversary."""
-        return self.taunts[::-1][self.limbs]
+        return self.taunts[-1 - self.limbs]
 
 
+@dataclass(frozen=True, slots=True)
 class Shrubbery:
     """A shrubbery bought in town."""
 
     looks_nice: bool
     too_expensive: bool
-
-    def __init__(self, looks_nice: bool, too_expensive: bool) -> None:
-        self.looks_nice = looks_nice
-        self.too_expensive = too_expensive
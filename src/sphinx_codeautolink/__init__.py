@@ -1,54 +1,63 @@
 """Sphinx extension for linking code examples to reference documentation."""
 
-from sphinx.application import Sphinx
+from __future__ import annotations
 
-from .extension import SphinxCodeAutoLink, backref, directive
-from .extension.block import clean_ipython, clean_pycon
+from copy import copy
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from sphinx.application import Sphinx
+
+    from .extension.block import clean_ipython, clean_pycon
 
 __version__ = "0.16.2"
+__all__ = ["clean_ipython", "clean_pycon", "setup"]
+
+# Name, default value and type of each configuration value,
+# mutable defaults are copied for each application in setup()
+_config_values = (
+    ("codeautolink_autodoc_inject", False, bool),
+    ("codeautolink_global_preface", "", str),
+    ("codeautolink_custom_blocks", {}, dict),
+    ("codeautolink_concat_default", False, bool),
+    ("codeautolink_search_css_classes", [], list),
+    ("codeautolink_inventory_map", {}, dict),
+    ("codeautolink_warn_on_missing_inventory", False, bool),
+    ("codeautolink_warn_on_failed_resolve", False, bool),
+)
+
+
+def __getattr__(name: str):
+    """Import cleanup functions lazily to keep importing the package cheap."""
+    if name in ("clean_pycon", "clean_ipython"):
+        from .extension import block  # noqa: PLC0415
+
+        return getattr(block, name)
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
+
+
+def __dir__() -> list[str]:
+    """List module attributes including the lazily imported ones."""
+    return sorted(globals().keys() | {"clean_ipython", "clean_pycon"})
 
 
 def setup(app: Sphinx):
     """Set up extension, directives and events."""
+    from .extension import SphinxCodeAutoLink, backref, directive  # noqa: PLC0415
+
     state = SphinxCodeAutoLink()
     app.setup_extension("sphinx.ext.autodoc")
     app.add_css_file("sphinx-codeautolink.css")
-    app.add_config_value(
-        "codeautolink_autodoc_inject", default=False, rebuild="html", types=[bool]
-    )
-    app.add_config_value(
-        "codeautolink_global_preface", default="", rebuild="html", types=[str]
-    )
-    app.add_config_value(
-        "codeautolink_custom_blocks", default={}, rebuild="html", types=[dict]
-    )
-    app.add_config_value(
-        "codeautolink_concat_default", default=False, rebuild="html", types=[bool]
-    )
-    app.add_config_value(
-        "codeautolink_search_css_classes", default=[], rebuild="html", types=[list]
-    )
-    app.add_config_value(
-        "codeautolink_inventory_map", default={}, rebuild="html", types=[dict]
-    )
-    app.add_config_value(
-        "codeautolink_warn_on_missing_inventory",
-        default=False,
-        rebuild="html",
-        types=[bool],
-    )
-    app.add_config_value(
-        "codeautolink_warn_on_failed_resolve",
-        default=False,
-        rebuild="html",
-        types=[bool],
-    )
+    for name, default, type_ in _config_values:
+        app.add_config_value(name, default=copy(default), rebuild="html", types=[type_])
 
     app.add_directive("autolink-concat", directive.Concat)
     app.add_directive("autolink-examples", directive.Examples)
     app.add_directive("autolink-preface", directive.Preface)
     app.add_directive("autolink-skip", directive.Skip)
 
+    app.connect("config-inited", state.config_inited)
     app.connect("builder-inited", state.build_inited)
     app.connect("autodoc-process-docstring", state.autodoc_process_docstring)
     app.connect("doctree-read", state.parse_blocks)
@@ -64,4 +73,9 @@ def setup(app: Sphinx):
     app.add_node(
         backref.SummaryNode, html=(backref.visit_summary, backref.depart_summary)
     )
-    return {"version": __version__, "env_version": 1, "parallel_read_safe": True}
+    return {
+        "version": __version__,
+        "env_version": 1,
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
@@ -2,25 +2,43 @@
 
 from __future__ import annotations
 
+import os
+from collections import defaultdict
+from collections.abc import Iterator
 from dataclasses import dataclass
 from functools import wraps
 from pathlib import Path
 from traceback import print_exc
 
-from sphinx.ext.intersphinx import InventoryAdapter
+from docutils import nodes
 from sphinx.util import import_object
 
 from sphinx_codeautolink.parse import Name
 from sphinx_codeautolink.warn import logger, warn_type
 
 from .backref import CodeExample, CodeRefsVisitor
-from .block import CodeBlockAnalyser, SourceTransform, link_html
+from .block import BUILTIN_BLOCKS, CodeBlockAnalyser, SourceTransform, link_html
 from .cache import DataCache
-from .directive import RemoveExtensionVisitor
-from .resolve import CouldNotResolve, resolve_location
-
-
-@dataclass
+from .directive import (
+    ConcatMarker,
+    DeferredExamples,
+    PrefaceMarker,
+    RemoveExtensionVisitor,
+    SkipMarker,
+)
+from .resolve import CouldNotResolve, clear_import_cache, resolve_location
+
+PARSED_NODES = (
+    nodes.literal_block,
+    nodes.doctest_block,
+    ConcatMarker,
+    PrefaceMarker,
+    SkipMarker,
+)
+STATIC_PATH = str(Path(__file__).parent.with_name("static").absolute())
+
+
+@dataclass(slots=True)
 class DocumentedObject:
     """Autodoc-documented code object."""
 
@@ -61,6 +79,12 @@ def print_exceptions(*, append_source: bool = False):
     return decorator
 
 
+def find_nodes(doctree: nodes.Node, types: tuple[type, ...]) -> Iterator[nodes.Node]:
+    """Find nodes of given types, using traverse before docutils 0.18."""
+    find = getattr(doctree, "findall", None) or doctree.traverse
+    return iter(find(lambda n: isinstance(n, types)))
+
+
 class SphinxCodeAutoLink:
     """Provide functionality and manage state between events."""
 
@@ -69,6 +93,7 @@ class SphinxCodeAutoLink:
         self.do_nothing = False
         self.global_preface: list[str] = []
         self.custom_blocks = None
+        self.transformers = None
         self.concat_default = None
         self.search_css_classes = None
         self.inventory_map: dict[str, str] = {}
@@ -76,13 +101,21 @@ class SphinxCodeAutoLink:
         self.warn_failed_resolve = None
 
         # Populated once
-        self.outdated_docs: set[str] = set()
+        self.outdated_docs: frozenset[str] = frozenset()
         self.inventory = {}
-        self.code_refs: dict[str, list[CodeExample]] = {}
+        self.code_refs: defaultdict[str, list[CodeExample]] = defaultdict(list)
+        self.backref_rows: dict[str, list[tuple[str, str]]] = {}
+        self.resolved: dict[tuple[str, ...], tuple[str | None, str]] = {}
 
         # Changing state
         self.cache: DataCache | None = None
 
+    def config_inited(self, app, config) -> None:
+        """Append static resources path so references in setup() are valid."""
+        # Before the environment compares configurations, to not report a change
+        if STATIC_PATH not in config.html_static_path:
+            config.html_static_path = [*config.html_static_path, STATIC_PATH]
+
     @print_exceptions()
     def build_inited(self, app) -> None:
         """Handle initial setup."""
@@ -93,27 +126,23 @@ class SphinxCodeAutoLink:
         self.cache = DataCache(app.doctreedir, app.srcdir)
         self.cache.read()
         app.env.sphinx_codeautolink_transforms = self.cache.transforms
-        self.outdated_docs = {str(Path(d)) for d in app.builder.get_outdated_docs()}
-        self.custom_blocks = app.config.codeautolink_custom_blocks
-        for k, v in self.custom_blocks.items():
-            if isinstance(v, str):
-                self.custom_blocks[k] = import_object(v)
+        self.outdated_docs = frozenset(app.builder.get_outdated_docs())
+        # Resolve into a new dict to keep the config value intact for caching
+        self.custom_blocks = {
+            k: import_object(v) if isinstance(v, str) else v
+            for k, v in app.config.codeautolink_custom_blocks.items()
+        }
+        self.transformers = BUILTIN_BLOCKS | self.custom_blocks
         self.concat_default = app.config.codeautolink_concat_default
         self.search_css_classes = app.config.codeautolink_search_css_classes
         self.inventory_map = app.config.codeautolink_inventory_map
         self.warn_missing_inventory = app.config.codeautolink_warn_on_missing_inventory
         self.warn_failed_resolve = app.config.codeautolink_warn_on_failed_resolve
 
-        # Append static resources path so references in setup() are valid
-        app.config.html_static_path.append(
-            str(Path(__file__).parent.with_name("static").absolute())
-        )
-
         preface = app.config.codeautolink_global_preface
         if preface:
             self.global_preface = preface.split("\n")
 
-    @print_exceptions()
     def autodoc_process_docstring(self, app, what, name, obj, options, lines) -> None:
         """Handle autodoc-process-docstring event."""
         if self.do_nothing:
@@ -130,15 +159,20 @@ class SphinxCodeAutoLink:
         if self.do_nothing:
             return
 
+        # Documents without code or markers need not be walked
+        if next(find_nodes(doctree, PARSED_NODES), None) is None:
+            self.cache.transforms[app.env.docname] = []
+            return
+
         visitor = CodeBlockAnalyser(
             doctree,
             source_dir=app.srcdir,
             global_preface=self.global_preface,
-            custom_blocks=self.custom_blocks,
+            transformers=self.transformers,
             concat_default=self.concat_default,
         )
         doctree.walkabout(visitor)
-        self.cache.transforms[visitor.current_document] = visitor.source_transforms
+        self.cache.transforms[app.env.docname] = visitor.source_transforms
 
     def merge_environments(self, app, env, docnames, other) -> None:
         """Merge transform information."""
@@ -155,19 +189,14 @@ class SphinxCodeAutoLink:
     @staticmethod
     def make_inventory(app):
         """Create object inventory from local info and intersphinx."""
-        inv_parts = {
-            k: str(
-                Path(app.outdir)
-                / (app.builder.get_target_uri(v.docname) + f"#{v.node_id}")
-            )
-            for k, v in app.env.domains["py"].objects.items()
-        }
-        inventory = {
-            "py:class": {k: (None, None, v, None) for k, v in inv_parts.items()}
-        }
-        inter_inv = InventoryAdapter(app.env).main_inventory
-        transposed = transpose_inventory(inter_inv, relative_to=app.outdir)
-        transposed.update(transpose_inventory(inventory, relative_to=app.outdir))
+        uris = {}
+        local = {}
+        for k, v in app.env.domains["py"].objects.items():
+            if v.docname not in uris:
+                uris[v.docname] = app.builder.get_target_uri(v.docname)
+            local[k] = f"{uris[v.docname]}#{v.node_id}"
+        transposed = dict(transpose_intersphinx(app))
+        transposed.update(local)
         return transposed
 
     @print_exceptions()
@@ -178,13 +207,20 @@ class SphinxCodeAutoLink:
 
         skipped = set()
         self.inventory = self.make_inventory(app)
+        clear_import_cache()
+        self.code_refs = defaultdict(list)
+        self.resolved = {}
+        self.backref_rows = {}
+        examples = {}
         for doc, transforms in self.cache.transforms.items():
             self.filter_and_resolve(transforms, skipped, doc)
             for transform in transforms:
-                for name in transform.names:
-                    self.code_refs.setdefault(name.resolved_location, []).append(
-                        transform.example
-                    )
+                ex = transform.example
+                key = (ex.document, ex.ref_id, tuple(ex.headings))
+                example = examples.setdefault(key, ex)
+                locations = dict.fromkeys(n.resolved_location for n in transform.names)
+                for location in locations:
+                    self.code_refs[location].append(example)
         if skipped and self.warn_missing_inventory:
             tops = sorted({s.split(".")[0] for s in skipped})
             msg = (
@@ -202,14 +238,13 @@ class SphinxCodeAutoLink:
             for name in transform.names:
                 if not name.code_str:
                     continue  # empty transform target (2 calls in a row)
-                try:
-                    key = resolve_location(name, self.inventory)
-                except CouldNotResolve as e:
+                key, error = self._resolve_location(name)
+                if key is None:
                     if self.warn_failed_resolve:
                         path = ".".join(name.import_components).replace(".()", "()")
                         msg = (
                             f"Could not resolve {self._resolve_msg(name)}"
-                            f" using path `{path}`.\n{e!s}"
+                            f" using path `{path}`.\n{error}"
                         )
                         logger.warning(
                             msg,
@@ -218,7 +253,6 @@ class SphinxCodeAutoLink:
                             location=(doc, transform.doc_lineno),
                         )
                     continue
-                key = self.inventory_map.get(key, key)
                 if key not in self.inventory:
                     if self.warn_missing_inventory:
                         msg = (
@@ -239,6 +273,19 @@ class SphinxCodeAutoLink:
                 filtered.append(name)
             transform.names = filtered
 
+    def _resolve_location(self, name: Name) -> tuple[str | None, str]:
+        """Resolve and remap name location, reusing results of identical paths."""
+        components = tuple(name.import_components)
+        if components not in self.resolved:
+            try:
+                key = resolve_location(name, self.inventory)
+            except CouldNotResolve as e:
+                # Keep only the message, the traceback would hold on to frames
+                self.resolved[components] = (None, str(e))
+            else:
+                self.resolved[components] = (self.inventory_map.get(key, key), "")
+        return self.resolved[components]
+
     @staticmethod
     def _resolve_msg(name: Name) -> str:
         if name.lineno == name.end_lineno:
@@ -249,15 +296,20 @@ class SphinxCodeAutoLink:
         return f"`{name.code_str}` on {line}"
 
     @print_exceptions(append_source=True)
-    def generate_backref_tables(self, app, doctree, docname):
+    def generate_backref_tables(self, app, doctree, docname) -> None:
         """Generate backreference tables."""
         if self.do_nothing:
-            rm_vis = RemoveExtensionVisitor(doctree)
-            return doctree.walkabout(rm_vis)
+            visitor = RemoveExtensionVisitor(doctree)
+            condition = (DeferredExamples, ConcatMarker, PrefaceMarker, SkipMarker)
+        else:
+            visitor = CodeRefsVisitor(
+                doctree, code_refs=self.code_refs, rows=self.backref_rows
+            )
+            condition = DeferredExamples
 
-        visitor = CodeRefsVisitor(doctree, code_refs=self.code_refs)
-        doctree.walk(visitor)
-        return None
+        # Every node is still visited, but only extension nodes are dispatched
+        for node in list(find_nodes(doctree, condition)):
+            visitor.dispatch_visit(node)
 
     @print_exceptions()
     def apply_links(self, app, exception) -> None:
@@ -265,8 +317,9 @@ class SphinxCodeAutoLink:
         if self.do_nothing or exception is not None:
             return
 
-        for doc, transforms in self.cache.transforms.items():
-            if not transforms or str(Path(doc)) not in self.outdated_docs:
+        for doc in sorted(self.outdated_docs & self.cache.transforms.keys()):
+            transforms = self.cache.transforms[doc]
+            if not transforms:
                 continue
             link_html(
                 doc,
@@ -280,6 +333,32 @@ class SphinxCodeAutoLink:
         self.cache.write()
 
 
+# Transposed intersphinx inventory of the latest build in this process
+_transposed_intersphinx: dict[tuple, dict[str, str]] = {}
+
+
+def transpose_intersphinx(app) -> dict[str, str]:
+    """
+    Transpose intersphinx inventory, reusing the result of previous builds.
+
+    The transposed inventory is kept in memory rather than in the environment
+    and recomputed when the fetched inventories or their priority change.
+    """
+    from sphinx.ext.intersphinx import InventoryAdapter  # noqa: PLC0415
+
+    adapter = InventoryAdapter(app.env)
+    key = (
+        str(app.outdir),
+        tuple(getattr(app.config, "intersphinx_mapping", None) or ()),
+        tuple((uri, entry[0], entry[1]) for uri, entry in adapter.cache.items()),
+    )
+    if key not in _transposed_intersphinx:
+        transposed = transpose_inventory(adapter.main_inventory, relative_to=app.outdir)
+        _transposed_intersphinx.clear()
+        _transposed_intersphinx[key] = transposed
+    return _transposed_intersphinx[key]
+
+
 def transpose_inventory(inv: dict, relative_to: str) -> dict[str, str]:
     """
     Transpose Sphinx inventory from {type: {name: (..., location)}} to {name: location}.
@@ -294,12 +373,16 @@ def transpose_inventory(inv: dict, relative_to: str) -> dict[str, str]:
         if a local file is found, transform it to be relative to this dir
     """
     transposed = {}
+    base = str(Path(relative_to)) + os.sep
     for type_, items in inv.items():
         if not type_.startswith("py:"):
             continue
         for item, info in items.items():
             location = info[2]
             if not location.startswith("http"):
-                location = str(Path(location).relative_to(relative_to))
+                if location.startswith(base):
+                    location = location[len(base) :]
+                else:
+                    location = os.path.relpath(location, relative_to)
             transposed[item] = location
     return transposed
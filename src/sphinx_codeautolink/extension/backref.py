@@ -7,7 +7,7 @@ from docutils import nodes
 from .directive import DeferredExamples
 
 
-@dataclass
+@dataclass(slots=True)
 class CodeExample:
     """Code example in the documentation."""
 
@@ -56,10 +56,15 @@ class CodeRefsVisitor(nodes.SparseNodeVisitor):
     """Replace :class:`DeferredCodeReferences` with table of concrete references."""
 
     def __init__(
-        self, *args, code_refs: dict[str, list[CodeExample]], **kwargs
+        self,
+        *args,
+        code_refs: dict[str, list[CodeExample]],
+        rows: dict[str, list[tuple[str, str]]],
+        **kwargs,
     ) -> None:
         super().__init__(*args, **kwargs)
         self.code_refs = code_refs
+        self.rows = rows
 
     def unknown_departure(self, node) -> None:
         """Ignore unknown nodes."""
@@ -69,14 +74,16 @@ class CodeRefsVisitor(nodes.SparseNodeVisitor):
         if not isinstance(node, DeferredExamples):
             return
 
-        items = []
-        for ref in self.code_refs.get(node.ref, []):
-            link = ref.document + ".html"
-            if ref.ref_id is not None:
-                link += f"#{ref.ref_id}"
-            items.append((link, " / ".join(ref.headings)))
+        if node.ref not in self.rows:
+            items = set()
+            for ref in self.code_refs.get(node.ref, []):
+                link = ref.document + ".html"
+                if ref.ref_id is not None:
+                    link += f"#{ref.ref_id}"
+                items.add((link, " / ".join(ref.headings)))
+            self.rows[node.ref] = sorted(items)
 
-        items = sorted(set(items))
+        items = self.rows[node.ref]
 
         if not items:
             # Remove surrounding paragraph too
@@ -3,12 +3,13 @@
 from __future__ import annotations
 
 import re
+from collections import defaultdict, deque
 from collections.abc import Callable
-from copy import copy
 from dataclasses import dataclass
+from functools import cache
 from pathlib import Path
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer, Tag
 from docutils import nodes
 
 from sphinx_codeautolink.parse import LinkContext, Name, parse_names
@@ -20,7 +21,7 @@ from .directive import ConcatMarker, PrefaceMarker, SkipMarker
 BUILTIN_BLOCKS = {"python": None, "py": None}
 
 
-@dataclass
+@dataclass(slots=True)
 class SourceTransform:
     """Transforms on source code."""
 
@@ -30,10 +31,16 @@ class SourceTransform:
     doc_lineno: int
 
 
+blankline = re.compile(r"^\s*<BLANKLINE>", flags=re.MULTILINE)
+ipython_in = r"In \[[0-9]+\]: "
+ipython_first_in = re.compile(rf"(\s*(#[^\n]*)?\n)*{ipython_in}")
+ipython_input = re.compile(rf"{ipython_in}|\s*\.*\.\.\.: |\s*#")
+
+
 def clean_pycon(source: str) -> tuple[str, str]:
     """Clean up Python console syntax to pure Python."""
     in_statement = False
-    source = re.sub(r"^\s*<BLANKLINE>", "", source, flags=re.MULTILINE)
+    source = blankline.sub("", source)
     clean_lines = []
     for line in source.split("\n"):
         if line.startswith(">>> "):
@@ -51,11 +58,10 @@ BUILTIN_BLOCKS["pycon"] = clean_pycon
 
 
 def _exclude_ipython_output(source: str) -> str:
-    in_regex = r"In \[[0-9]+\]: "
     # If the first line doesn't begin with a console prompt,
     # assume the entire block to be purely IPython *code*.
     # An arbitrary number of comments and empty lines are exempt.
-    if not re.match(rf"^(\s*(#[^\n]*)?\n)*{in_regex}", source):
+    if not ipython_first_in.match(source):
         return source
 
     clean_lines = []
@@ -63,14 +69,7 @@ def _exclude_ipython_output(source: str) -> str:
         # Space after "In" is required by transformer but removed in RST preprocessing.
         # All comment are passed through even if they are strictly not input to allow
         # leading comment lines to not be stripped by the IPython transformer.
-        if (
-            re.match(rf"^{in_regex}", line)
-            or re.match(r"^\s*\.*\.\.\.: ", line)
-            or re.match(r"^\s*#", line)
-        ):
-            in_statement = True
-        else:
-            in_statement = False
+        in_statement = ipython_input.match(line) is not None
         clean_lines.append(line * in_statement)
     return "\n".join(clean_lines)
 
@@ -92,6 +91,8 @@ else:
     BUILTIN_BLOCKS["ipython"] = clean_ipython
     BUILTIN_BLOCKS["ipython3"] = clean_ipython
 
+BUILTIN_CLASSES = (*(f"highlight-{t}" for t in BUILTIN_BLOCKS), "doctest")
+
 
 class CodeBlockAnalyser(nodes.SparseNodeVisitor):
     """Transform literal blocks of Python with links to reference documentation."""
@@ -101,18 +102,17 @@ class CodeBlockAnalyser(nodes.SparseNodeVisitor):
         *args,
         source_dir: str,
         global_preface: list[str],
-        custom_blocks: dict[str, Callable[[str], str]],
+        transformers: dict[str, Callable[[str], tuple[str, str]] | None],
         concat_default: bool,
         **kwargs,
     ) -> None:
         super().__init__(*args, **kwargs)
         self.source_transforms: list[SourceTransform] = []
         relative_path = Path(self.document["source"]).relative_to(source_dir)
-        self.current_document = str(relative_path.with_suffix(""))
+        self.current_document = relative_path.with_suffix("").as_posix()
         self.global_preface = global_preface
-        self.transformers = BUILTIN_BLOCKS.copy()
-        self.transformers.update(custom_blocks)
-        self.valid_blocks = self.transformers.keys()
+        self.transformers = transformers
+        self.valid_blocks = transformers.keys()
         self.title_stack = []
         self.current_refid = None
         self.prefaces = []
@@ -120,6 +120,24 @@ class CodeBlockAnalyser(nodes.SparseNodeVisitor):
         self.concat_section = False
         self.concat_sources = []
         self.skip = None
+        self._visit_methods = {}
+        self._depart_methods = {}
+
+    def dispatch_visit(self, node):
+        """Call visitor method, looking it up once per node type."""
+        type_ = type(node)
+        if type_ not in self._visit_methods:
+            method = getattr(self, f"visit_{type_.__name__}", self.unknown_visit)
+            self._visit_methods[type_] = method
+        return self._visit_methods[type_](node)
+
+    def dispatch_departure(self, node):
+        """Call departure method, looking it up once per node type."""
+        type_ = type(node)
+        if type_ not in self._depart_methods:
+            method = getattr(self, f"depart_{type_.__name__}", self.unknown_departure)
+            self._depart_methods[type_] = method
+        return self._depart_methods[type_](node)
 
     def unknown_visit(self, node) -> None:
         """Handle and delete custom directives, ignore others."""
@@ -284,45 +302,45 @@ def link_html(
     search_css_classes: list,
 ) -> None:
     """Inject links to code blocks on disk."""
+    if not any(trans.names for trans in transforms):
+        return
+
     html_file = Path(out_dir) / (document + ".html")
     text = html_file.read_text("utf-8")
-    soup = BeautifulSoup(text, "html.parser")
 
-    block_types = BUILTIN_BLOCKS.keys() | custom_blocks.keys()
-    classes = [f"highlight-{t}" for t in block_types] + ["doctest"]
-    classes += search_css_classes
-
-    blocks = []
-    for c in classes:
-        blocks.extend(list(soup.find_all("div", attrs={"class": c})))
-    unique_blocks = {b.sourceline: b for b in blocks}.values()
-    blocks = sorted(unique_blocks, key=lambda b: b.sourceline)
-    inners = [block.select("div > pre")[0] for block in blocks]
+    classes = [
+        *BUILTIN_CLASSES,
+        *(f"highlight-{t}" for t in custom_blocks),
+        *search_css_classes,
+    ]
 
-    up_lvls = len(html_file.relative_to(out_dir).parents) - 1
-    local_prefix = "../" * up_lvls
+    inners = _find_code_blocks(text, classes)
+    local_prefix = "../" * document.count("/")
     link_pattern = (
         '<a href="{link}" title="{title}" class="sphinx-codeautolink-a">{text}</a>'
     )
+    line_starts = [0, *(m.end() for m in re.finditer("\n", text))]
+    edits = []
 
-    for trans in transforms:
-        for ix in range(len(inners)):
-            candidate = copy(inners[ix])
-
-            # remove line numbers for matching
-            for lineno in candidate.find_all("span", attrs={"class": "linenos"}):
-                lineno.extract()
+    # Blocks with identical text are matched in document order
+    inners_by_text = defaultdict(deque)
+    for inner in inners:
+        inners_by_text[_block_text(inner)].append(inner)
 
-            if trans.source.rstrip() == "".join(candidate.strings).rstrip():
-                inner = inners.pop(ix)
-                break
-        else:
+    for trans in transforms:
+        candidates = inners_by_text.get(trans.source.rstrip())
+        if not candidates:
             msg = f"Could not match a code example to HTML, source:\n{trans.source}"
             logger.warning(
                 msg, type=warn_type, subtype="match_block", location=document
             )
             continue
 
+        # Pop regardless to keep pairing identical blocks in order
+        inner = candidates.popleft()
+        if not trans.names:
+            continue
+
         lines = str(inner).split("\n")
 
         for name in trans.names:
@@ -331,7 +349,8 @@ def link_html(
             selection = "\n".join(lines[begin_line : end_line + 1])
 
             # Reverse because a.b = a.b should replace from the right
-            matches = list(re.finditer(construct_name_pattern(name), selection))[::-1]
+            pattern = compile_name_pattern(name.context, name.code_str)
+            matches = list(pattern.finditer(selection))[::-1]
             if not matches:
                 msg = (
                     f"Could not match transformation of `{name.code_str}` "
@@ -346,7 +365,7 @@ def link_html(
             start, end = matches[0].span()
             start += len(matches[0].group(1))
             location = inventory[name.resolved_location]
-            if not any(location.startswith(s) for s in ("http://", "https://")):
+            if not location.startswith(("http://", "https://")):
                 location = local_prefix + location
             link = link_pattern.format(
                 link=location, title=name.resolved_location, text=selection[start:end]
@@ -354,9 +373,48 @@ def link_html(
             transformed = selection[:start] + link + selection[end:]
             lines[begin_line : end_line + 1] = transformed.split("\n")
 
-        inner.replace_with(BeautifulSoup("\n".join(lines), "html.parser"))
+        # Splice the linked block into the original text at the source position
+        start = line_starts[inner.sourceline - 1] + inner.sourcepos
+        end = text.index("</pre>", start) + len("</pre>")
+        edits.append((start, end, "\n".join(lines)))
+
+    if edits:
+        html_file.write_text(_splice(text, edits), "utf-8")
+
+
+def _find_code_blocks(text: str, classes: list[str]) -> list[Tag]:
+    """Find the pre tags of code blocks in HTML, in document order."""
+    # Only build the code blocks, the rest of the page is left untouched
+    wanted = set(classes)
+    strainer = SoupStrainer(
+        "div",
+        attrs={"class": lambda c: c is not None and not wanted.isdisjoint(c.split())},
+    )
+    soup = BeautifulSoup(text, "html.parser", parse_only=strainer)
+
+    # Class values are matched one by one, so a set lookup finds all in one pass
+    blocks = soup.find_all("div", attrs={"class": lambda c: c in wanted})
+    unique_blocks = {b.sourceline: b for b in blocks}.values()
+    return [block.select("div > pre")[0] for block in unique_blocks]
+
+
+def _block_text(inner: Tag) -> str:
+    """Extract the text of a code block for matching to its source."""
+    # skip line numbers for matching
+    return "".join(
+        s for s in inner.strings if "linenos" not in s.parent.get("class", ())
+    ).rstrip()
 
-    html_file.write_text(str(soup), "utf-8")
+
+def _splice(text: str, edits: list[tuple[int, int, str]]) -> str:
+    """Replace non-overlapping (start, end) spans of text."""
+    chunks = []
+    previous = 0
+    for start, end, replacement in sorted(edits):
+        chunks.extend((text[previous:start], replacement))
+        previous = end
+    chunks.append(text[previous:])
+    return "".join(chunks)
 
 
 # ---------------------------------------------------------------
@@ -390,26 +448,32 @@ from_pre = rf'(<span class="kn">from</span>{whitespace})'
 from_post = rf'(?={whitespace}<span class="kn">import</span>)'
 
 
-def construct_name_pattern(name: Name) -> str:
+@cache
+def compile_name_pattern(context: LinkContext | None, code_str: str) -> re.Pattern:
+    """Compile and cache the regex pattern of a name in HTML."""
+    return re.compile(construct_name_pattern(context, code_str))
+
+
+def construct_name_pattern(context: LinkContext | None, code_str: str) -> str:
     """Construct a regex pattern for searching a name in HTML."""
-    if name.context == LinkContext.none:
-        parts = name.code_str.split(".")
+    if context == LinkContext.none:
+        parts = code_str.split(".")
         pattern = period.join(
             [first_name_pattern.format(name=parts[0])]
             + [name_pattern.format(name=p) for p in parts[1:]]
         )
         return no_dot_pre + pattern + no_dot_post
-    if name.context == LinkContext.after_call:
-        parts = name.code_str.split(".")
+    if context == LinkContext.after_call:
+        parts = code_str.split(".")
         pattern = period.join(
             [first_name_pattern.format(name=parts[0])]
             + [name_pattern.format(name=p) for p in parts[1:]]
         )
         return call_dot_pre + pattern + no_dot_post
-    if name.context == LinkContext.import_from:
-        pattern = import_from_pattern.format(name=name.code_str)
+    if context == LinkContext.import_from:
+        pattern = import_from_pattern.format(name=code_str)
         return from_pre + pattern + from_post
-    if name.context == LinkContext.import_target:
-        pattern = import_target_pattern.format(name=name.code_str)
+    if context == LinkContext.import_target:
+        pattern = import_target_pattern.format(name=code_str)
         return import_pre + pattern + import_post
     return None
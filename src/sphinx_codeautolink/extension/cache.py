@@ -1,7 +1,9 @@
 """Extension data cache."""
 
 import json
+import sys
 from dataclasses import asdict
+from hashlib import blake2b
 from pathlib import Path
 
 from .block import CodeExample, Name, SourceTransform
@@ -16,21 +18,48 @@ class DataCache:
         self.cache_dir: Path = Path(cache_dir)
         self.src_dir: Path = Path(src_dir)
         self.transforms: dict[str, list[SourceTransform]] = {}
+        self.digest: bytes | None = None
 
     def read(self) -> None:
         """Read from cache."""
         cache = self.cache_dir / self.cache_filename
         if not cache.exists():
             return
-        content = json.loads(cache.read_text("utf-8"))
-        for file, transforms in content.items():
+        raw = cache.read_bytes()
+        self.digest = blake2b(raw).digest()
+        content = json.loads(raw)
+        # List each directory once instead of checking every file separately
+        listings: dict[Path, set[str]] = {}
+        for key, transforms in content.items():
+            # Caches written before docnames were used have OS-specific separators
+            file = key.replace("\\", "/")
             full_path = self.src_dir / (file + ".rst")
-            if not full_path.exists():
+            folder = full_path.parent
+            if folder not in listings:
+                try:
+                    listings[folder] = {p.name for p in folder.iterdir()}
+                except OSError:
+                    listings[folder] = set()
+            if full_path.name not in listings[folder]:
                 continue
-            for transform in transforms:
-                transform["example"] = CodeExample(**transform["example"])
-                transform["names"] = [Name(**n) for n in transform["names"]]
-            self.transforms[file] = [SourceTransform(**t) for t in transforms]
+            self.transforms[file] = [
+                SourceTransform(
+                    source=t["source"],
+                    names=[Name(**n) for n in t["names"]],
+                    example=self._read_example(t["example"]),
+                    doc_lineno=t["doc_lineno"],
+                )
+                for t in transforms
+            ]
+
+    @staticmethod
+    def _read_example(data: dict) -> CodeExample:
+        # Share the strings repeated across all examples of a document
+        return CodeExample(
+            document=sys.intern(data["document"]),
+            ref_id=data["ref_id"],
+            headings=[sys.intern(h) for h in data["headings"]],
+        )
 
     def write(self) -> None:
         """Write to cache."""
@@ -38,4 +67,9 @@ class DataCache:
         transforms_dict = {}
         for file, transforms in self.transforms.items():
             transforms_dict[file] = [asdict(t) for t in transforms]
-        cache.write_text(json.dumps(transforms_dict, indent=2), "utf-8")
+        raw = json.dumps(transforms_dict, separators=(",", ":")).encode("utf-8")
+        digest = blake2b(raw).digest()
+        if digest == self.digest:
+            return
+        cache.write_bytes(raw)
+        self.digest = digest
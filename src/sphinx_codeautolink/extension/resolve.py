@@ -158,20 +158,38 @@ def get_name_for_debugging(thing: type | Callable) -> str:
         return repr(thing)
 
 
+_modules: dict[str, Any] = {}
+
+
+def import_cached(name: str) -> Any:
+    """Import module by name, caching failures as the ImportError without traceback."""
+    if name not in _modules:
+        try:
+            _modules[name] = import_module(name)
+        except ImportError as e:
+            _modules[name] = e.with_traceback(None)
+    return _modules[name]
+
+
+def clear_import_cache() -> None:
+    """Forget imports of previous builds to retry modules that failed to import."""
+    _modules.clear()
+    closest_module.cache_clear()
+
+
 @cache
 def closest_module(components: tuple[str, ...]) -> tuple[Any, int]:
     """Find closest importable module."""
-    try:
-        mod = import_module(components[0])
-    except ImportError as e:
+    mod = import_cached(components[0])
+    if isinstance(mod, ImportError):
         msg = f"Could not import {components[0]}."
-        raise CouldNotResolve(msg) from e
+        raise CouldNotResolve(msg) from mod
 
     for i in range(1, len(components)):
-        try:
-            mod = import_module(".".join(components[: i + 1]))
-        except ImportError:  # noqa: PERF203
+        submod = import_cached(".".join(components[: i + 1]))
+        if isinstance(submod, ImportError):
             # import failed, exclude previously added item
             return mod, i
+        mod = submod
     # imports succeeded, include all items
     return mod, len(components)
@@ -4,7 +4,6 @@ from __future__ import annotations
 
 import ast
 import builtins
-import sys
 from collections.abc import Generator
 from contextlib import contextmanager
 from dataclasses import dataclass, field
@@ -14,8 +13,6 @@ from importlib import import_module
 
 from .warn import logger, warn_type
 
-HAS_MATCH = sys.version_info >= (3, 10)
-
 
 def parse_names(source: str, doctree_node) -> list[Name]:
     """Parse names from source."""
@@ -26,8 +23,8 @@ def parse_names(source: str, doctree_node) -> list[Name]:
 
 
 def linenos(node: ast.AST) -> tuple[int, int]:
-    """Return lineno and end_lineno safely."""
-    return node.lineno, getattr(node, "end_lineno", node.lineno)
+    """Return lineno and end_lineno."""
+    return node.lineno, node.end_lineno
 
 
 @dataclass
@@ -53,12 +50,12 @@ class Component:
             name = node.arg
         elif isinstance(node, ast.Call):
             name = NameBreak.call
-        elif HAS_MATCH and isinstance(node, ast.MatchAs):
+        elif isinstance(node, ast.MatchAs):
             name = node.name
             context = "store"
         else:
             msg = f"Invalid AST for component: {node.__class__.__name__}"
-            raise ValueError(msg)
+            raise ValueError(msg)  # noqa: TRY004
         return cls(name, *linenos(node), context)
 
 
@@ -279,9 +276,7 @@ class ImportTrackerVisitor(ast.NodeVisitor):
         self._parents = old
 
     # Nodes that are excempt from resetting parents in default visit
-    track_nodes = (ast.Name, ast.Attribute, ast.Call, ast.NamedExpr)
-    if HAS_MATCH:
-        track_nodes += (ast.MatchAs,)
+    track_nodes = (ast.Name, ast.Attribute, ast.Call, ast.NamedExpr, ast.MatchAs)
 
     def visit(self, node: ast.AST):
         """Override default visit to track name access and assignments."""
@@ -482,10 +477,6 @@ class ImportTrackerVisitor(ast.NodeVisitor):
         with self.reset_parents():
             for arg in node.args + node.keywords:
                 self.visit(arg)
-            if hasattr(node, "starargs"):
-                self.visit(node.starargs)
-            if hasattr(node, "kwargs"):
-                self.visit(node.kwargs)
         return inner
 
     @track_parents
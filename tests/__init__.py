@@ -1,3 +1,5 @@
+from unittest.mock import Mock
+
 import sphinx_codeautolink
 
 
@@ -10,3 +12,24 @@ class TestPackage:
 
     def test_clean_ipython_public(self):
         assert sphinx_codeautolink.clean_ipython
+
+    def test_star_import_exports_public(self):
+        namespace = {}
+        exec("from sphinx_codeautolink import *", namespace)  # noqa: S102
+        assert {"clean_pycon", "clean_ipython", "setup"} <= namespace.keys()
+
+    def test_dir_lists_lazy_attributes(self):
+        assert {"clean_pycon", "clean_ipython"} <= set(dir(sphinx_codeautolink))
+
+    def test_setup_copies_mutable_defaults(self):
+        apps = [Mock(), Mock()]
+        for app in apps:
+            sphinx_codeautolink.setup(app)
+
+        first, second = (
+            {c.args[0]: c.kwargs["default"] for c in app.add_config_value.mock_calls}
+            for app in apps
+        )
+        for name, default in first.items():
+            if isinstance(default, dict | list):
+                assert default is not second[name]
@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import importlib
+import json
+import os
+import pickle
 import re
 import sys
 from pathlib import Path
@@ -9,6 +13,8 @@ import pytest
 from bs4 import BeautifulSoup
 from sphinx.cmd.build import main as sphinx_main
 
+from sphinx_codeautolink.extension import transpose_inventory
+
 from ._check import check_link_targets
 
 # Insert test package root to path for all tests
@@ -218,6 +224,165 @@ Another
     _sphinx_build(tmp_path, "html", {})
 
 
+def test_build_twice_without_changes_keeps_cache(tmp_path: Path):
+    index = """
+Test project
+------------
+
+.. code:: python
+
+   import test_project
+   test_project.bar()
+
+.. automodule:: test_project
+"""
+    files = {"conf.py": default_conf, "index.rst": index}
+    _sphinx_build(tmp_path, "html", files)
+    cache = tmp_path / "build" / "doctrees" / "codeautolink-cache.json"
+    os.utime(cache, ns=(0, 0))
+
+    _sphinx_build(tmp_path, "html", {})
+    assert cache.stat().st_mtime_ns == 0
+
+    _sphinx_build(
+        tmp_path, "html", {"index.rst": index + "\n.. code:: python\n\n   1\n"}
+    )
+    assert cache.stat().st_mtime_ns != 0
+
+
+def test_build_twice_reuses_intersphinx_inventory(tmp_path: Path):
+    index = """
+Test project
+------------
+
+.. code:: python
+
+   import test_project
+   test_project.bar()
+
+.. automodule:: test_project
+"""
+    files = {"conf.py": default_conf, "index.rst": index}
+    _sphinx_build(tmp_path, "html", files)
+
+    target = "sphinx_codeautolink.extension.transpose_inventory"
+    with patch(target, wraps=transpose_inventory) as transpose:
+        _sphinx_build(tmp_path, "html", {})
+    transpose.assert_not_called()
+
+    # Same environment, but a new output directory
+    src_dir = str(tmp_path / "src")
+    out_dir = str(tmp_path / "other")
+    doctree_dir = str(tmp_path / "build" / "doctrees")
+    args = ["-b", "html", src_dir, out_dir, "-d", doctree_dir, "-W"]
+    with patch(target, wraps=transpose_inventory) as transpose:
+        assert not sphinx_main(args)
+    transpose.assert_called_once()
+
+
+def test_build_twice_with_custom_block_string(
+    tmp_path: Path, capsys: pytest.CaptureFixture
+):
+    index = """
+Test project
+------------
+
+.. code:: python3
+
+   >>> import test_project
+   >>> test_project.bar()
+
+.. automodule:: test_project
+"""
+    conf = (
+        default_conf
+        + """
+codeautolink_custom_blocks = {"python3": "sphinx_codeautolink.clean_pycon"}
+"""
+    )
+    files = {"conf.py": conf, "index.rst": index}
+    _sphinx_build(tmp_path, "html", files)
+    capsys.readouterr()
+    _sphinx_build(tmp_path, "html", {})
+
+    out, err = capsys.readouterr()
+    assert "configuration has changed" not in out + err
+    assert "config.cache" not in out + err
+    assert "0 added, 0 changed, 0 removed" in out
+
+    pickled = tmp_path / "build" / "doctrees" / "environment.pickle"
+    with pickled.open("rb") as f:
+        env = pickle.load(f)  # noqa: S301
+    blocks = env.config.codeautolink_custom_blocks
+    assert blocks == {"python3": "sphinx_codeautolink.clean_pycon"}
+
+
+def test_build_twice_with_legacy_cache_keys(tmp_path: Path):
+    index = """
+Test project
+------------
+
+.. toctree::
+
+   sub/page
+"""
+    page = """
+Page
+----
+
+.. code:: python
+
+   import test_project
+   test_project.bar()
+
+.. automodule:: test_project
+"""
+    (tmp_path / "src" / "sub").mkdir(parents=True)
+    files = {"conf.py": default_conf, "index.rst": index, "sub/page.rst": page}
+    _sphinx_build(tmp_path, "html", files)
+
+    # Emulate a cache written on Windows before keys were docnames
+    cache = tmp_path / "build" / "doctrees" / "codeautolink-cache.json"
+    content = json.loads(cache.read_text("utf-8"))
+    content = {k.replace("/", "\\"): v for k, v in content.items()}
+    cache.write_text(json.dumps(content), "utf-8")
+
+    _sphinx_build(tmp_path, "html", {})
+    assert sorted(json.loads(cache.read_text("utf-8"))) == ["index", "sub/page"]
+
+
+def test_build_twice_retries_failed_import(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    index = """
+Test project
+------------
+
+.. code:: python
+
+   import late_project
+   late_project.bar().attr
+"""
+    conf = default_conf.replace(
+        "codeautolink_warn_on_missing_inventory = True",
+        "codeautolink_warn_on_missing_inventory = False",
+    )
+    files = {"conf.py": conf, "index.rst": index}
+    monkeypatch.syspath_prepend(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        _sphinx_build(tmp_path, "html", files)
+
+    module = """
+class Foo:
+    attr = 1
+
+def bar() -> Foo: ...
+"""
+    (tmp_path / "late_project.py").write_text(module, "utf-8")
+    importlib.invalidate_caches()
+    _sphinx_build(tmp_path, "html", {"index.rst": index + "\nEdited.\n"})
+
+
 def test_raise_unexpected(tmp_path: Path):
     index = """
 Test project